@@ -7,6 +7,7 @@ Enterprise-grade threat detection with advanced AI capabilities
 import json
 import os
 import sys
+import orjson
 import asyncio
 import logging
 from datetime import datetime
@@ -52,6 +53,7 @@ websocket_connections: List[WebSocket] = []
 # Professional data paths
 DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'honeypot', 'data')
 SESSIONS_FILE = os.path.join(DATA_DIR, 'sessions.json')
+HONEYPOT_SESSIONS_FILE = os.path.join(DATA_DIR, 'sessions.jsonl')
 COMMANDS_FILE = os.path.join(DATA_DIR, 'commands.log')
 MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'honeypot', 'models')
 THREATS_FILE = os.path.join(DATA_DIR, 'threat_intelligence.json')
@@ -101,6 +103,17 @@ class AnalyzeRequest(BaseModel):
     command: str
     ip: str = "unknown"
 
+# Professional threat categories
+THREAT_PATTERNS = {
+    'system_destruction': ('rm -rf/', 'del /f', 'format c:', 'mkfs', 'dd if='),
+    'privilege_escalation': ('sudo', 'su -', 'chmod +s', 'setuid', 'passwd'),
+    'data_access': ('cat /etc/passwd', 'cat /etc/shadow', 'cat /proc/', 'strings '),
+    'network_exploitation': ('nc -l', 'nc ', 'netcat', 'telnet', 'ssh -i'),
+    'code_execution': ('python -c', 'bash -c', 'sh -c', 'eval(', 'exec('),
+    'system_reconnaissance': ('whoami', 'id', 'uname -a', 'ps aux', 'netstat'),
+    'file_manipulation': ('chmod +x', 'mv ', 'cp ', 'touch ', 'mkdir ')
+}
+
 # Professional Utility Functions
 def analyze_command_threat(command: str, ip: str) -> Dict[str, Any]:
     """Professional AI threat analysis"""
@@ -129,19 +142,8 @@ def analyze_command_threat(command: str, ip: str) -> Dict[str, Any]:
     if char_ratio > 0.3:
         threat_scoring['suspicious_patterns'] += 0.2
     
-    # Professional threat categories
-    threat_patterns = {
-        'system_destruction': ['rm -rf/', 'del /f', 'format c:', 'mkfs', 'dd if='],
-        'privilege_escalation': ['sudo', 'su -', 'chmod +s', 'setuid', 'passwd'],
-        'data_access': ['cat /etc/passwd', 'cat /etc/shadow', 'cat /proc/', 'strings '],
-        'network_exploitation': ['nc -l', 'nc ', 'netcat', 'telnet', 'ssh -i'],
-        'code_execution': ['python -c', 'bash -c', 'sh -c', 'eval(', 'exec('],
-        'system_reconnaissance': ['whoami', 'id', 'uname -a', 'ps aux', 'netstat'],
-        'file_manipulation': ['chmod +x', 'mv ', 'cp ', 'touch ', 'mkdir ']
-    }
-    
     # Analyze against threat patterns
-    for category, patterns in threat_patterns.items():
+    for category, patterns in THREAT_PATTERNS.items():
         category_score = 0
         for pattern in patterns:
             if pattern in command_lower:
@@ -291,7 +293,7 @@ def update_threat_intelligence(ip: str, analysis: Dict[str, Any]):
             )
         
         with open(THREATS_FILE, 'w') as f:
-            json.dump({ip: data.__dict__ for ip, data in intelligence.items()}, f, indent=2)
+            json.dump({ip: data.__dict__ for ip, data in intelligence.items()}, f, separators=(',', ':'))
             
     except Exception as e:
         logger.error(f"Error updating threat intelligence: {e}")
@@ -385,7 +387,8 @@ def system_health():
     }
 
 @app.get("/sessions")
-def get_session_analytics(page: int = 1, limit: int = 50, threat_level: str = None, ip: str = None):
+def get_session_analytics(page: int = 1, limit: int = 50, threat_level: str = None, ip: str = None,
+                          format: str = "rows"):
     """Professional session analytics with advanced filtering"""
     try:
         sessions = load_sessions()
@@ -411,8 +414,14 @@ def get_session_analytics(page: int = 1, limit: int = 50, threat_level: str = No
                                       x.get('timestamp', ''))
                                   , reverse=True)
         
+        # Column-oriented payload avoids repeating every key per session
+        if format == "columns":
+            payload = {"columns": sessions_to_columns(paginated_sessions)}
+        else:
+            payload = {"sessions": paginated_sessions}
+        
         return {
-            "sessions": paginated_sessions,
+            **payload,
             "pagination": {
                 "current_page": page,
                 "total_pages": (total_count + limit - 1) // limit,
@@ -486,9 +495,6 @@ def get_professional_statistics():
         
         # Professional statistics calculation
         total_sessions = len(sessions)
-        critical_sessions = [s for s in sessions if s.get('threat_level') == 'CRITICAL']
-        high_sessions = [s for s in sessions if s.get('threat_level') == 'HIGH']
-        total_threats = len(critical_sessions) + len(high_sessions)
         
         # Threat level distribution
         threat_levels = {"LOW": 0, "MEDIUM": 0, "HIGH": 0, "CRITICAL": 0}
@@ -509,6 +515,7 @@ def get_professional_statistics():
             country = session.get('geographic_location', 'Unknown')
             geographic_distribution[country] = geographic_distribution.get(country, 0) + 1
         
+        total_threats = threat_levels['HIGH'] + threat_levels['CRITICAL']
         avg_score = sum(scores) / len(scores) if scores else 0.0
         
         # Top threat IPs with intelligence
@@ -624,11 +631,38 @@ async def professional_websocket(websocket: WebSocket):
 
 # Professional utility functions
 def load_sessions() -> List[Dict]:
-    """Load professional sessions"""
+    """Load professional sessions, including those captured by the honeypot"""
+    return load_recorded_sessions() + load_honeypot_sessions()
+
+def load_honeypot_sessions() -> List[Dict]:
+    """Load sessions from the honeypot's append-only JSONL log"""
+    try:
+        if not os.path.exists(HONEYPOT_SESSIONS_FILE):
+            return []
+        sessions = []
+        skipped = 0
+        with open(HONEYPOT_SESSIONS_FILE, 'rb') as f:
+            for line in f:
+                # Skip a trailing line the honeypot may still be writing
+                if not line.endswith(b"\n") or not line.strip():
+                    continue
+                try:
+                    sessions.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    skipped += 1
+        if skipped:
+            logger.warning(f"Skipped {skipped} malformed lines in {HONEYPOT_SESSIONS_FILE}")
+        return sessions
+    except Exception as e:
+        logger.error(f"Error loading honeypot sessions: {e}")
+        return []
+
+def load_recorded_sessions() -> List[Dict]:
+    """Load sessions recorded through the API"""
     try:
         if os.path.exists(SESSIONS_FILE):
-            with open(SESSIONS_FILE, 'r') as f:
-                sessions = json.load(f)
+            with open(SESSIONS_FILE, 'rb') as f:
+                sessions = orjson.loads(f.read())
         else:
             # Professional sample data
             sessions = [
@@ -682,18 +716,26 @@ def load_sessions() -> List[Dict]:
         logger.error(f"Error loading sessions: {e}")
         return []
 
+def sessions_to_columns(sessions: List[Dict]) -> Dict[str, List[Any]]:
+    """Convert session rows into column-oriented lists"""
+    keys = {}
+    for session in sessions:
+        keys.update(dict.fromkeys(session))
+    
+    return {key: [session.get(key) for session in sessions] for key in keys}
+
 def save_professional_session(session: Dict) -> bool:
     """Save professional session"""
     try:
-        sessions = load_sessions()
+        sessions = load_recorded_sessions()
         sessions.append(session)
         
         # Keep last 1500 sessions for optimal performance
         if len(sessions) > 1500:
             sessions = sessions[-1500:]
         
-        with open(SESSIONS_FILE, 'w') as f:
-            json.dump(sessions, f, indent=2)
+        with open(SESSIONS_FILE, 'wb') as f:
+            f.write(orjson.dumps(sessions))
         
         # Professional command logging
         log_entry = f"{session['timestamp']}:{session['ip']}:{session['command']}:{session['threat_level']}:{session.get('attack_vector', 'Unknown')}:{session.get('confidence', 0.0)}:{session.get('threat_signature', 'N/A')}\n"
@@ -2,7 +2,10 @@ import joblib
 import os
 import numpy as np
 import json
+import orjson
 import logging
+import hashlib
+import shelve
 from datetime import datetime
 from typing import Dict, List, Any, Tuple
 from dotenv import load_dotenv
@@ -14,6 +17,22 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Command patterns scored by extract_features
+SUSPICIOUS_PATTERNS = (
+    "rm -rf", "sudo", "su -", "passwd", "shadow",
+    "iptables", "netstat", "ps aux", "whoami", "id",
+    "curl", "wget", "nc ", "netcat", "telnet",
+    "ftp", "nmap", "hydra", "john", "hashcat",
+    "python", "bash", "sh ", "chmod", "chown",
+    "kill", "pkill", "killall", "systemctl",
+    "journalctl", "cat /etc", "cat /proc", "ls -la",
+    "find ", "grep ", "awk", "sed", "xargs", "..",
+    "/dev/null", "2>&1", ">/dev/null", "&&", "||"
+)
+
+# Entries kept in the on-disk analysis cache before it is emptied
+ANALYSIS_CACHE_SIZE = 50000
+
 class AIManager:
     """AI/ML Manager for honeypot threat detection"""
     
@@ -22,14 +41,27 @@ class AIManager:
         self.scaler_path = os.path.join(os.path.dirname(self.model_path), "scaler.joblib")
         self.vectorizer_path = os.path.join(os.path.dirname(self.model_path), "vectorizer.joblib")
         self.model_stats_path = os.path.join(os.path.dirname(self.model_path), "stats.json")
+        self.analysis_cache_path = os.path.join(os.path.dirname(self.model_path), "analysis_cache")
         
         self.model = None
         self.scaler = None
         self.vectorizer = None
         self.model_stats = {}
+        self._model_version = None
+        
+        # Incremental read position in the honeypot's JSONL command log
+        self._command_log_inode = None
+        self._command_log_offset = 0
+        self._command_log_records = []
+        self._command_log_mtime = None
+        self._command_log_head = b""
+        self._command_file_signature = None
+        self._command_file_records = []
         
         self._ensure_model_directory()
         self._load_models()
+        self._analysis_cache = self._open_analysis_cache()
+        self._analysis_cache_count = len(self._analysis_cache)
 
     def _ensure_model_directory(self):
         """Ensure model directory exists"""
@@ -42,6 +74,7 @@ class AIManager:
             # Load IsolationForest model
             if os.path.exists(self.model_path):
                 self.model = joblib.load(self.model_path)
+                self._model_version = self._read_model_version()
                 logger.info(f"Loaded IsolationForest model from {self.model_path}")
             else:
                 logger.info("No existing model found, will create new one")
@@ -73,6 +106,29 @@ class AIManager:
         except Exception as e:
             logger.error(f"Error loading models: {e}")
 
+    def _read_model_version(self) -> str:
+        """Identify the on-disk model so cached analyses are tied to it"""
+        st = os.stat(self.model_path)
+        return f"{st.st_mtime_ns}:{st.st_size}"
+
+    def _open_analysis_cache(self):
+        """Open the on-disk command analysis cache"""
+        try:
+            return shelve.open(self.analysis_cache_path)
+        except Exception as e:
+            logger.error(f"Error opening analysis cache: {e}")
+            return {}
+
+    def _clear_analysis_cache(self):
+        """Drop cached analyses after the model changes"""
+        try:
+            self._analysis_cache.clear()
+            self._analysis_cache_count = 0
+            if hasattr(self._analysis_cache, "sync"):
+                self._analysis_cache.sync()
+        except Exception as e:
+            logger.error(f"Error clearing analysis cache: {e}")
+
     def extract_features(self, command: str) -> Dict[str, Any]:
         """Extract comprehensive features from a command"""
         # Basic features
@@ -86,25 +142,13 @@ class AIManager:
             "has_numbers": bool(sum(c.isdigit() for c in command)),
         }
 
-        # Command patterns
-        suspicious_patterns = [
-            "rm -rf", "sudo", "su -", "passwd", "shadow",
-            "iptables", "netstat", "ps aux", "whoami", "id",
-            "curl", "wget", "nc ", "netcat", "telnet",
-            "ftp", "nmap", "hydra", "john", "hashcat",
-            "python", "bash", "sh ", "chmod", "chown",
-            "kill", "pkill", "killall", "systemctl",
-            "journalctl", "cat /etc", "cat /proc", "ls -la",
-            "find ", "grep ", "awk", "sed", "xargs", "..",
-            "/dev/null", "2>&1", ">/dev/null", "&&", "||"
-        ]
-
         # Check for suspicious patterns
+        command_lower = command.lower()
         suspicious_score = 0
         detected_patterns = []
         
-        for pattern in suspicious_patterns:
-            if pattern in command.lower():
+        for pattern in SUSPICIOUS_PATTERNS:
+            if pattern in command_lower:
                 suspicious_score += 1
                 detected_patterns.append(pattern)
 
@@ -154,9 +198,13 @@ class AIManager:
 
     def predict_anomaly(self, features: Dict[str, Any]) -> float:
         """Predict anomaly score for command"""
+        return self._predict_anomaly(features)[0]
+
+    def _predict_anomaly(self, features: Dict[str, Any]) -> Tuple[float, bool]:
+        """Predict anomaly score, also reporting whether the model produced it"""
         if self.model is None:
             # Fallback to simple heuristic
-            return self._heuristic_score(features)
+            return self._heuristic_score(features), False
         
         try:
             feature_vector = self.create_feature_vector(features)
@@ -170,13 +218,13 @@ class AIManager:
                 score = self.model.decision_function(feature_vector)[0]
                 # Normalize score to 0-1 range
                 normalized_score = max(0, min(1, (score + self.model.offset_[0]) / (2 * self.model.offset_[0]) + 0.5))
-                return 1 - normalized_score  # Higher score = more anomalous
+                return 1 - normalized_score, True  # Higher score = more anomalous
             else:
                 prediction = self.model.predict(feature_vector)[0]
-                return 1 if prediction == -1 else 0
+                return (1 if prediction == -1 else 0), True
         except Exception as e:
             logger.error(f"Error predicting anomaly: {e}")
-            return self._heuristic_score(features)
+            return self._heuristic_score(features), False
 
     def _heuristic_score(self, features: Dict[str, Any]) -> float:
         """Simple heuristic scoring when ML model is not available"""
@@ -246,10 +294,12 @@ class AIManager:
             )
             
             self.model.fit(X_scaled)
+            self._clear_analysis_cache()
             
             # Save models
             joblib.dump(self.model, self.model_path)
             joblib.dump(self.scaler, self.scaler_path)
+            self._model_version = self._read_model_version()
             
             # Update stats
             self.model_stats = {
@@ -282,14 +332,22 @@ class AIManager:
         try:
             # Get commands from data files
             commands_file = "/app/data/commands.json"
-            if not os.path.exists(commands_file):
+            commands_jsonl = "/app/data/commands.jsonl"
+            if not os.path.exists(commands_file) and not os.path.exists(commands_jsonl):
                 return {"status": "error", "message": "No command data found"}
             
-            with open(commands_file, 'r') as f:
-                commands_data = json.load(f)
+            commands_data = []
+            if os.path.exists(commands_file):
+                commands_data = self._read_command_file(commands_file)
+            
+            # Append-only log written by the honeypot's ConnectionHandler
+            if os.path.exists(commands_jsonl):
+                commands_data = commands_data + self._read_command_log(commands_jsonl)
             
-            commands = [cmd.get("command", "") for cmd in commands_data 
-                       if cmd.get("command")]
+            commands = [cmd.get("command") if isinstance(cmd, dict) else cmd
+                        for cmd in commands_data
+                        if (isinstance(cmd, dict) and cmd.get("command"))
+                        or (isinstance(cmd, str) and cmd)]
             
             if len(commands) < 10:
                 return {"status": "warning", "message": f"Insufficient data ({len(commands)} commands), need at least 10"}
@@ -300,6 +358,82 @@ class AIManager:
             logger.error(f"Error during retraining: {e}")
             return {"status": "error", "message": str(e)}
 
+    def _read_command_file(self, file_path: str) -> List[Any]:
+        """Return records from the JSON command file, re-parsing only when it has changed"""
+        st = os.stat(file_path)
+        signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if signature == self._command_file_signature:
+            return self._command_file_records
+        
+        with open(file_path, 'rb') as f:
+            commands_data = orjson.loads(f.read())
+        
+        # Accept both a bare list and the {"commands": [...]} envelope
+        if isinstance(commands_data, dict):
+            commands_data = commands_data.get("commands", [])
+        
+        self._command_file_signature = signature
+        self._command_file_records = commands_data
+        return commands_data
+
+    def _read_command_log(self, file_path: str) -> List[Dict[str, Any]]:
+        """Return records from a JSONL command log, parsing only lines added since the last read"""
+        st = os.stat(file_path)
+        if st.st_ino != self._command_log_inode or st.st_size < self._command_log_offset:
+            # New, rotated, or truncated-in-place log: start from the beginning
+            self._command_log_inode = st.st_ino
+            self._reset_command_log()
+        elif st.st_size == self._command_log_offset and st.st_mtime_ns == self._command_log_mtime:
+            # Nothing appended since the last read, no need to open the file
+            return self._command_log_records
+        
+        with open(file_path, 'rb') as f:
+            if self._command_log_offset and not self._command_log_continues(f):
+                # Rewritten in place and regrown past our offset: start from the beginning
+                logger.info(f"{file_path} was rewritten, re-reading from the start")
+                self._reset_command_log()
+            if not self._command_log_offset:
+                self._command_log_head = f.read(64)
+            
+            f.seek(self._command_log_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Partially written line, pick it up next time
+                self._command_log_offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    self._command_log_records.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    logger.warning(f"Skipping malformed line at byte {self._command_log_offset - len(line)} of {file_path}")
+        
+        self._command_log_mtime = st.st_mtime_ns
+        return self._command_log_records
+
+    def _reset_command_log(self):
+        """Forget the read position and records of the JSONL command log"""
+        self._command_log_offset = 0
+        self._command_log_records = []
+        self._command_log_head = b""
+
+    def _command_log_continues(self, f) -> bool:
+        """Check that the open log still starts with the bytes we read and that our offset is a line boundary"""
+        f.seek(0)
+        if f.read(len(self._command_log_head)) != self._command_log_head:
+            return False
+        f.seek(self._command_log_offset - 1)
+        return f.read(1) == b"\n"
+
+    def _cache_analysis(self, cache_key: str, analysis: Dict[str, Any]):
+        """Store an analysis, emptying the cache first once it reaches its size cap"""
+        try:
+            if self._analysis_cache_count >= ANALYSIS_CACHE_SIZE:
+                self._clear_analysis_cache()
+            self._analysis_cache[cache_key] = analysis
+            self._analysis_cache_count += 1
+        except Exception as e:
+            logger.error(f"Error caching analysis: {e}")
+
     def get_model_stats(self) -> Dict[str, Any]:
         """Get current model statistics"""
         stats = {
@@ -315,15 +449,29 @@ class AIManager:
 
     def validate_command(self, command: str) -> Dict[str, Any]:
         """Validate and analyze a command"""
-        features = self.extract_features(command)
-        anomaly_score = self.predict_anomaly(features)
-        threat_level = self.get_threat_level(anomaly_score)
+        # Reuse analyses persisted across restarts while the same model file is loaded
+        digest = hashlib.sha256(command.encode("utf-8", "surrogatepass")).hexdigest()
+        cache_key = f"{self._model_version}:{digest}"
+        cached = self._analysis_cache.get(cache_key) if self._model_version else None
+        if cached is None:
+            features = self.extract_features(command)
+            anomaly_score, from_model = self._predict_anomaly(features)
+            cached = {
+                "features": features,
+                "anomaly_score": anomaly_score,
+                "threat_level": self.get_threat_level(anomaly_score)
+            }
+            # Heuristic fallbacks are not cached; they change once a model is available
+            if from_model and self._model_version:
+                self._cache_analysis(cache_key, cached)
+        
+        features = cached["features"]
         
         return {
             "command": command,
             "features": features,
-            "anomaly_score": anomaly_score,
-            "threat_level": threat_level,
+            "anomaly_score": cached["anomaly_score"],
+            "threat_level": cached["threat_level"],
             "risk_factors": features["detected_patterns"],
             "analysis_timestamp": datetime.now().isoformat()
         }
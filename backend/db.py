@@ -5,9 +5,14 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 import uuid
 import logging
+from array import array
+from collections import Counter
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+THREAT_LEVEL_RANKS = {"LOW": 1, "MEDIUM": 2, "HIGH": 3, "CRITICAL": 4}
+
 class CommandSession:
     def __init__(self, session_id: str, ip: str, command: str, 
                  anomaly_score: float, threat_level: str, timestamp: str = None):
@@ -27,12 +32,43 @@ class DatabaseManager:
         self._ensure_data_directory()
         self._sessions_data = self._load_data(self.data_file)
         self._commands_data = self._load_data(self.commands_file)
+        # Per-file write lock and latest requested snapshot generation
+        self._save_locks: Dict[str, asyncio.Lock] = {}
+        self._save_generations: Dict[str, int] = {}
+        # Sessions are kept in timestamp order; new ones are appended in order
+        self._sessions_data.sort(key=lambda x: x.get("timestamp", ""))
+        self._rebuild_columns()
 
     def _ensure_data_directory(self):
         """Ensure data directory exists"""
         data_dir = os.path.dirname(self.data_file)
         os.makedirs(data_dir, exist_ok=True)
 
+    def _rebuild_columns(self):
+        """Rebuild the columnar copies of the stat-relevant session fields"""
+        self._ips: List[str] = []
+        self._threat_codes = array('b')
+        self._scores = array('f')
+        self._threat_ranks = array('b')
+        self._threat_level_codes: Dict[str, int] = {}
+        self._threat_level_names: List[str] = []
+        for session in self._sessions_data:
+            self._append_columns(session)
+
+    def _append_columns(self, session: Dict):
+        """Append one session's stat fields to the columnar arrays"""
+        threat_level = session.get("threat_level", "LOW")
+        code = self._threat_level_codes.get(threat_level)
+        if code is None:
+            code = len(self._threat_level_names)
+            self._threat_level_codes[threat_level] = code
+            self._threat_level_names.append(threat_level)
+        
+        self._ips.append(session.get("ip", "unknown"))
+        self._threat_codes.append(code)
+        self._scores.append(session.get("anomaly_score") or 0.0)
+        self._threat_ranks.append(THREAT_LEVEL_RANKS.get(threat_level, 1))
+
     def _load_data(self, file_path: str) -> List[Dict]:
         """Load data from JSON file"""
         try:
@@ -47,15 +83,50 @@ class DatabaseManager:
     def _save_data(self, file_path: str, data: List[Dict]):
         """Save data to JSON file"""
         try:
-            with open(file_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            # Write a temp file and swap it in so readers never see a partial file
+            tmp_path = file_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, file_path)
         except Exception as e:
             logger.error(f"Error saving data to {file_path}: {e}")
 
+    async def _save_data_async(self, file_path: str, data: List[Dict]):
+        """Save data to JSON file without blocking the event loop"""
+        # Snapshot the list so appends during the write don't race the dump
+        snapshot = list(data)
+        generation = self._save_generations.get(file_path, 0) + 1
+        self._save_generations[file_path] = generation
+        
+        lock = self._save_locks.setdefault(file_path, asyncio.Lock())
+        async with lock:
+            # A newer snapshot is already waiting; let that one write instead
+            if self._save_generations[file_path] != generation:
+                return
+            await asyncio.to_thread(self._save_data, file_path, snapshot)
+
+    @staticmethod
+    def _parse_timestamp(data_item: Dict) -> str:
+        """Return the item's timestamp as a naive local-time datetime64-parsable string"""
+        try:
+            parsed = datetime.fromisoformat(data_item.get("timestamp", ""))
+            if parsed.tzinfo is not None:
+                # Compare aware timestamps in local time, like the naive cutoff
+                parsed = parsed.astimezone().replace(tzinfo=None)
+            return parsed.isoformat()
+        except Exception:
+            return "NaT"
+
+    @staticmethod
+    def _has_utc_offset(timestamp: str) -> bool:
+        """Whether an ISO timestamp carries a UTC offset after its time part"""
+        return any(c in timestamp[19:] for c in "+-Z")
+
     async def save_command(self, ip: str, command: str, anomaly_score: float, 
                           threat_level: str) -> str:
         """Save a command session and return session ID"""
         session_id = str(uuid.uuid4())
+        timestamp = datetime.now().isoformat()
         
         session_data = {
             "session_id": session_id,
@@ -63,35 +134,33 @@ class DatabaseManager:
             "command": command,
             "anomaly_score": anomaly_score,
             "threat_level": threat_level,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp
         }
         
         # Save to sessions
         self._sessions_data.append(session_data)
-        self._save_data(self.data_file, self._sessions_data)
+        self._append_columns(session_data)
+        await self._save_data_async(self.data_file, self._sessions_data)
         
         # Save to commands for ML training
         command_data = {
             "session_id": session_id,
             "command": command,
             "anomaly_score": anomaly_score,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp
         }
         
         self._commands_data.append(command_data)
-        self._save_data(self.commands_file, self._commands_data)
+        await self._save_data_async(self.commands_file, self._commands_data)
         
         logger.info(f"Saved command session {session_id} from IP {ip}")
         return session_id
 
     async def get_all_sessions(self, limit: int = None) -> List[Dict]:
         """Get all command sessions"""
-        sessions = sorted(self._sessions_data, 
-                         key=lambda x: x.get("timestamp", ""), 
-                         reverse=True)
         if limit:
-            sessions = sessions[:limit]
-        return sessions
+            return self._sessions_data[:-limit - 1:-1]
+        return self._sessions_data[::-1]
 
     async def get_session(self, session_id: str) -> Optional[Dict]:
         """Get specific session by ID"""
@@ -114,45 +183,34 @@ class DatabaseManager:
 
     async def get_threats(self, min_threat_level: str = "MEDIUM") -> List[Dict]:
         """Get all high-threat commands"""
-        threat_levels = {"LOW": 1, "MEDIUM": 2, "HIGH": 3, "CRITICAL": 4}
-        min_level = threat_levels.get(min_threat_level, 2)
+        min_level = THREAT_LEVEL_RANKS.get(min_threat_level, 2)
         
-        threats = []
-        for session in self._sessions_data:
-            threat_level = session.get("threat_level", "LOW")
-            if threat_levels.get(threat_level, 1) >= min_level:
-                threats.append(session)
-        
-        return sorted(threats, key=lambda x: x.get("timestamp", ""), reverse=True)
+        # Filter on the precomputed rank column; sessions are already in time order
+        ranks = np.frombuffer(self._threat_ranks, dtype=np.int8)
+        return [self._sessions_data[i] for i in np.flatnonzero(ranks >= min_level)[::-1]]
 
     async def get_statistics(self) -> Dict[str, Any]:
         """Get database statistics"""
         total_sessions = len(self._sessions_data)
         total_commands = len(self._commands_data)
         
-        # Count by threat level
-        threat_counts = {}
-        ip_counts = {}
-        
-        for session in self._sessions_data:
-            threat_level = session.get("threat_level", "LOW")
-            threat_counts[threat_level] = threat_counts.get(threat_level, 0) + 1
-            
-            ip = session.get("ip", "unknown")
-            ip_counts[ip] = ip_counts.get(ip, 0) + 1
+        # Count by threat level over the columnar arrays
+        level_counts = np.bincount(np.frombuffer(self._threat_codes, dtype=np.int8),
+                                   minlength=len(self._threat_level_names))
+        threat_counts = {level: int(count) 
+                         for level, count in zip(self._threat_level_names, level_counts)
+                         if count}
         
         # Calculate average anomaly score
-        scores = [s.get("anomaly_score", 0) for s in self._sessions_data]
-        avg_score = sum(scores) / len(self._sessions_data) if scores else 0
+        scores = np.frombuffer(self._scores, dtype=np.float32)
+        avg_score = float(scores.mean()) if scores.size else 0
         
         return {
             "total_sessions": total_sessions,
             "total_commands": total_commands,
-            "total_threats": sum(count for level, count in threat_counts.items() 
-                               if level in ["HIGH", "CRITICAL"]),
+            "total_threats": threat_counts.get("HIGH", 0) + threat_counts.get("CRITICAL", 0),
             "threat_counts": threat_counts,
-            "top_attacking_ips": sorted(ip_counts.items(), 
-                                       key=lambda x: x[1], reverse=True)[:10],
+            "top_attacking_ips": Counter(self._ips).most_common(10),
             "average_anomaly_score": round(avg_score, 2),
             "last_updated": datetime.now().isoformat()
         }
@@ -164,23 +222,32 @@ class DatabaseManager:
 
     async def cleanup_old_data(self, days_to_keep: int = 30):
         """Remove old data to prevent file bloat"""
-        cutoff = datetime.now().timestamp() - (days_to_keep * 24 * 3600)
+        cutoff = np.datetime64(datetime.now()) - np.timedelta64(days_to_keep, 'D')
         
-        def is_recent(data_item):
+        def keep_recent(data_items):
+            # Parse every timestamp in one vectorized pass; missing ones become NaT.
+            # NumPy would read offset timestamps as UTC, so convert those to local time first
+            raw = [item.get("timestamp") or "NaT" for item in data_items]
+            raw = [self._parse_timestamp(item) if self._has_utc_offset(ts) else ts
+                   for item, ts in zip(data_items, raw)]
             try:
-                timestamp = datetime.fromisoformat(data_item.get("timestamp", ""))
-                return timestamp.timestamp() > cutoff
-            except:
-                return False
+                timestamps = np.array(raw, dtype='datetime64[us]')
+            except ValueError:
+                # Malformed timestamps: fall back to per-row parsing
+                timestamps = np.array([self._parse_timestamp(item) for item in data_items],
+                                      dtype='datetime64[us]')
+            mask = timestamps > cutoff
+            return [item for item, recent in zip(data_items, mask) if recent]
         
         initial_sessions = len(self._sessions_data)
         initial_commands = len(self._commands_data)
         
-        self._sessions_data = [s for s in self._sessions_data if is_recent(s)]
-        self._commands_data = [c for c in self._commands_data if is_recent(c)]
+        self._sessions_data = keep_recent(self._sessions_data)
+        self._commands_data = keep_recent(self._commands_data)
+        self._rebuild_columns()
         
-        self._save_data(self.data_file, self._sessions_data)
-        self._save_data(self.commands_file, self._commands_data)
+        await self._save_data_async(self.data_file, self._sessions_data)
+        await self._save_data_async(self.commands_file, self._commands_data)
         
         removed_sessions = initial_sessions - len(self._sessions_data)
         removed_commands = initial_commands - len(self._commands_data)
@@ -1,6 +1,7 @@
 import os
 import requests
 import logging
+from requests.adapters import HTTPAdapter
 from typing import Optional
 from dotenv import load_dotenv
 
@@ -16,6 +17,10 @@ class TelegramAlertManager:
         self.chat_id = os.getenv("TELEGRAM_CHAT_ID")
         self.max_message_length = 4096
         
+        # Keep-alive connection pool so alerts reuse the TLS connection to api.telegram.org
+        self._http = requests.Session()
+        self._http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        
         if not self.bot_token or not self.chat_id:
             logger.warning("Telegram credentials not configured")
         else:
@@ -43,14 +48,15 @@ class TelegramAlertManager:
                 "parse_mode": "HTML"
             }
 
-            response = requests.post(url, json=payload, timeout=10)
+            response = self._http.post(url, json=payload, timeout=10)
             response.raise_for_status()
+            result = response.json()
 
-            if response.json().get("ok"):
+            if result.get("ok"):
                 logger.info("Telegram alert sent successfully")
                 return True
             else:
-                logger.error(f"Telegram API error: {response.json()}")
+                logger.error(f"Telegram API error: {result}")
                 return False
 
         except requests.exceptions.RequestException as e:
@@ -166,7 +172,7 @@ class TelegramAlertManager:
 
         try:
             url = f"https://api.telegram.org/bot{self.bot_token}/getMe"
-            response = requests.get(url, timeout=10)
+            response = self._http.get(url, timeout=10)
             response.raise_for_status()
             
             bot_info = response.json()
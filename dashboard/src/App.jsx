@@ -10,6 +10,22 @@ import './index.css';
 
 const API_BASE = 'http://localhost:8001';
 
+// Rebuild session rows from the column-oriented /sessions payload
+const columnsToSessions = (columns) => {
+  if (!columns) return [];
+  const keys = Object.keys(columns);
+  const count = keys.length ? columns[keys[0]].length : 0;
+  const sessions = new Array(count);
+  for (let i = 0; i < count; i++) {
+    const session = {};
+    for (const key of keys) {
+      if (columns[key][i] !== null) session[key] = columns[key][i];
+    }
+    sessions[i] = session;
+  }
+  return sessions;
+};
+
 function App() {
   const [sessions, setSessions] = useState([]);
   const [stats, setStats] = useState({
@@ -34,10 +50,10 @@ function App() {
   // Professional data fetching
   const fetchProfessionalSessions = async () => {
     try {
-      const response = await fetch(`${API_BASE}/sessions`);
+      const response = await fetch(`${API_BASE}/sessions?format=columns`);
       if (!response.ok) throw new Error('Failed to fetch session data');
       const data = await response.json();
-      setSessions(data.sessions || []);
+      setSessions(columnsToSessions(data.columns));
     } catch (err) {
       console.error('Session fetch error:', err);
       setError(err.message);
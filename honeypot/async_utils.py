@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Async helpers shared by the AIML Honeypot modules
+Batching queue for background writers and a reusable aiohttp session
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class BatchQueue:
+    """Bounded queue drained in batches by a lazily started consumer task"""
+
+    def __init__(self, handler: Callable[[List[Any]], Awaitable[None]], maxsize: int,
+                 batch_size: int, flush_interval: float, drop_oldest: bool = False,
+                 name: str = "queue", idle_interval: Optional[float] = None,
+                 on_idle: Optional[Callable[[], Awaitable[None]]] = None):
+        self._handler = handler
+        self._maxsize = maxsize
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._drop_oldest = drop_oldest
+        self._name = name
+        self._idle_interval = idle_interval
+        self._on_idle = on_idle
+        self._queue = None
+        self._task = None
+        self.dropped = 0
+
+    def put(self, item: Any) -> bool:
+        """Queue an item, starting the consumer if needed; returns False if an item was dropped"""
+        if self._task is None or self._task.done():
+            self._queue = self._queue or asyncio.Queue(maxsize=self._maxsize)
+            self._task = asyncio.create_task(self._consume())
+
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self._drop_oldest:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._queue.put_nowait(item)
+                logger.warning(f"{self._name} full, dropped oldest item ({self.dropped} total)")
+            else:
+                logger.warning(f"{self._name} full, dropped new item ({self.dropped} total)")
+            return False
+
+    async def _next_item(self, idle_pending: bool):
+        """Wait for the next item, running on_idle once if the queue stays empty"""
+        if not idle_pending or self._on_idle is None:
+            return await self._queue.get()
+        try:
+            return await asyncio.wait_for(self._queue.get(), self._idle_interval)
+        except asyncio.TimeoutError:
+            try:
+                await self._on_idle()
+            except Exception as e:
+                logger.error(f"{self._name} idle callback error: {e}")
+            return await self._queue.get()
+
+    async def _consume(self):
+        """Collect items into batches and hand each batch to the handler"""
+        loop = asyncio.get_running_loop()
+        idle_pending = False
+
+        while True:
+            batch = [await self._next_item(idle_pending)]
+            deadline = loop.time() + self._flush_interval
+
+            # Collect up to batch_size items or until the flush interval elapses
+            while len(batch) < self._batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._handler(batch)
+            except Exception as e:
+                logger.error(f"{self._name} batch error: {e}")
+            finally:
+                idle_pending = True
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def join(self):
+        """Wait until every queued item has been handled"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self, timeout: float = 5.0):
+        """Drain pending items (up to timeout seconds), then stop the consumer"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self._name} not drained within {timeout}s, discarding remaining items")
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+def ensure_http_session(session: Optional[aiohttp.ClientSession], total_timeout: float,
+                        **connector_kwargs) -> aiohttp.ClientSession:
+    """Return session if it is still open, otherwise a new one with the given settings"""
+    if session is not None and not session.closed:
+        return session
+    connector = aiohttp.TCPConnector(**connector_kwargs) if connector_kwargs else None
+    return aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=total_timeout),
+        connector=connector
+    )
@@ -8,133 +8,36 @@ import asyncio
 import os
 import json
 import csv
+import random
+import time
+from collections import deque
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import logging
 
+from async_utils import BatchQueue
+
 logger = logging.getLogger(__name__)
 
-class ConnectionHandler:
-    """Handles connection processing and response generation"""
-    
-    def __init__(self):
-        self.sessions_log = "/app/data/sessions.json"
-        self.commands_log = "/app/data/commands.json"
-        self.tsv_log = "/app/data/commands.tsv"
-        self._ensure_log_files()
+HIGH_THREAT_LEVELS = frozenset({"HIGH", "CRITICAL"})
 
-    def _ensure_log_files(self):
-        """Ensure log files exist"""
-        os.makedirs(os.path.dirname(self.sessions_log), exist_ok=True)
-        
-        # Initialize files if they don't exist
-        for log_file in [self.sessions_log, self.commands_log]:
-            if not os.path.exists(log_file):
-                with open(log_file, 'w') as f:
-                    json.dump([], f)
-
-        # Initialize CSV/TSV if needed
-        if not os.path.exists(self.tsv_log):
-            with open(self.tsv_log, 'w') as f:
-                f.write("timestamp\tip\tcommand\tthreat_level\tanomaly_score\n")
+# JSONL logs are trimmed to MAX_LOG_ENTRIES every TRIM_INTERVAL appends
+MAX_LOG_ENTRIES = 10000
+TRIM_INTERVAL = 1000
 
-    async def log_command(self, command: str, ip: str, analysis: Dict[str, Any]):
-        """Log command with analysis results"""
-        try:
-            timestamp = datetime.now().isoformat()
-            session_id = f"{ip}_{int(datetime.now().timestamp())}"
-            
-            # Create session entry
-            session_entry = {
-                "session_id": session_id,
-                "timestamp": timestamp,
-                "ip": ip,
-                "command": command,
-                "analysis": analysis,
-                "threat_level": analysis.get("threat_level", "UNKNOWN"),
-                "anomaly_score": analysis.get("anomaly_score", 0.0)
-            }
-            
-            # Append to JSON logs
-            await self._append_to_json(self.sessions_log, session_entry)
-            await self._append_to_json(self.commands_log, {
-                "timestamp": timestamp,
-                "ip": ip,
-                "command": command,
-                "threat_level": analysis.get("threat_level", "UNKNOWN"),
-                "anomaly_score": analysis.get("anomaly_score", 0.0)
-            })
-            
-            # Append to TSV for analysis
-            await self._append_to_tsv(
-                timestamp, ip, command, 
-                analysis.get("threat_level", "UNKNOWN"),
-                analysis.get("anomaly_score", 0.0)
-            )
-            
-            logger.info(f"Logged command: {command} from {ip} (Threat: {analysis.get('threat_level')})")
-            
-        except Exception as e:
-            logger.error(f"Error logging command: {e}")
-
-    async def _append_to_json(self, file_path: str, data: Dict[str, Any]):
-        """Append data to JSON log file"""
-        try:
-            # Read existing data
-            with open(file_path, 'r') as f:
-                logs = json.load(f)
-            
-            # Add new entry
-            logs.append(data)
-            
-            # Keep only last 10000 entries to prevent file bloat
-            if len(logs) > 10000:
-                logs = logs[-10000:]
-            
-            # Write back
-            with open(file_path, 'w') as f:
-                json.dump(logs, f, indent=2)
-                
-        except Exception as e:
-            logger.error(f"Error appending to {file_path}: {e}")
+# Background log writer: bounded queue, flushed in batches
+LOG_QUEUE_SIZE = 10000
+LOG_BATCH_SIZE = 256
+LOG_FLUSH_INTERVAL = 0.05
+LOG_FSYNC_INTERVAL = 1.0
 
-    async def _append_to_tsv(self, timestamp: str, ip: str, command: str, threat_level: str, score: float):
-        """Append to TSV log for easy parsing"""
-        try:
-            with open(self.tsv_log, 'a') as f:
-                # Escape tabs and newlines in command
-                safe_command = command.replace('\t', '\\t').replace('\n', '\\n')
-                f.write(f"{timestamp}\t{ip}\t{safe_command}\t{threat_level}\t{score}\n")
-        except Exception as e:
-            logger.error(f"Error appending to TSV: {e}")
+# Translation table escaping TSV field separators in logged commands
+TSV_ESCAPE = str.maketrans({'\t': '\\t', '\n': '\\n', '\r': '\\r'})
 
-    async def generate_response(self, command: str, analysis: Dict[str, Any]) -> str:
-        """Generate realistic response based on command and threat level"""
-        threat_level = analysis.get("threat_level", "LOW")
-        
-        # Get base response
-        response = self._get_command_response(command.strip())
-        
-        # Add threat-based delays and additional output
-        if threat_level in ["HIGH", "CRITICAL"]:
-            # Add suspicious behavior indicators
-            response += self._add_suspicious_output(command)
-        elif threat_level == "MEDIUM":
-            response += self._add_warning_output(command)
-        
-        # Add prompt
-        response += "\n[root@server ~]# "
-        
-        return response
+# Canned shell output served by ConnectionHandler._get_command_response
+LS_OUTPUT = "backups  config.ini  cronjob.sh  data  deploy.sh  logs  temp  update.sh  watchdog.sh"
 
-    def _get_command_response(self, command: str) -> str:
-        """Get realistic response for command"""
-        command_lower = command.lower()
-        
-        # File operations
-        if command_lower.startswith("ls"):
-            if "-la" in command_lower or "-a" in command_lower:
-                return """total 84
+LS_LONG_OUTPUT = """total 84
 drwxr-xr-x 22 root root  4096 Jan 15 10:30 .
 drwxr-xr-x 23 root root  4096 Dec 23 08:15 ..
 -rw-------  1 root root  1234 Jan 14 09:20 .bash_history
@@ -148,23 +51,8 @@ drwxr-xr-x  2 root root  4096 Jan 05 11:20 logs
 drwxrwxr-x  2 root root  4096 Dec 20 09:15 temp
 -rwxr-xr-x  1 root root  2048 Jan 12 13:25 update.sh
 -rwxr-xr-x  1 root root  512  Dec 18 07:30 watchdog.sh"""
-            else:
-                return """backups  config.ini  cronjob.sh  data  deploy.sh  logs  temp  update.sh  watchdog.sh"""
-        
-        elif command_lower == "pwd":
-            return "/root"
-        
-        elif command_lower == "whoami":
-            return "root"
-        
-        elif command_lower.startswith("uname"):
-            return "Linux server 5.4.0-94-generic #106-Ubuntu SMP Thu Jan 6 23:58:14 UTC 2022 x86_64 x86_64 x86_64 GNU/Linux"
-        
-        elif command_lower == "id":
-            return "uid=0(root) gid=0(root) groups=0(root)"
-        
-        elif command_lower.startswith("ps aux"):
-            return """USER       PID %CPU %MEM    VSZ   RSS TTY      STAT START   TIME COMMAND
+
+PS_AUX_OUTPUT = """USER       PID %CPU %MEM    VSZ   RSS TTY      STAT START   TIME COMMAND
 root         1  0.0  0.1 225836  9216 ?        Ss   Jan15   0:02 /sbin/init
 root         2  0.0  0.0      0     0 ?        S    Jan15   0:00 [kthreadd]
 root         3  0.0  0.0      0     0 ?        I<   Jan15   0:00 [rcu_gp]
@@ -172,9 +60,8 @@ root         4  0.0  0.0      0     0 ?        I<   Jan15   0:00 [rcu_par_gp]
 root         5  0.0  0.0      0     0 ?        I<   Jan15   0:00 [netns]
 root        87 0.0 0.3 201532 24784 ?        Ss   Jan15   0:00 sshd: /usr/sbin/sshd [listener] 
 root       234 0.0 0.1 185268  8504 ?        Ss   Jan15   0:00 crond"""
-        
-        elif command_lower.startswith("cat /etc/passwd"):
-            return """root:x:0:0:root:/root:/bin/bash
+
+PASSWD_OUTPUT = """root:x:0:0:root:/root:/bin/bash
 daemon:x:1:1:daemon:/usr/sbin:/usr/sbin/nologin
 bin:x:2:2:bin:/bin:/usr/sbin/nologin
 sys:x:3:3:sys:/dev:/usr/sbin/nologin
@@ -184,17 +71,15 @@ man:x:6:12:man:/var/cache/man:/usr/sbin/nologin
 lp:x:7:7:lp:/var/spool/lpd:/usr/sbin/nologin
 mail:x:8:8:mail:/var/mail:/usr/sbin/nologin
 news:x:9:9:news:/var/spool/news:/usr/sbin/nologin"""
-        
-        elif command_lower.startswith("netstat"):
-            return """Active Internet connections (only servers)
+
+NETSTAT_OUTPUT = """Active Internet connections (only servers)
 Proto Recv-Q Send-Q Local Address           Foreign Address         State      
 tcp        0      0 0.0.0.0:22              0.0.0.0:*               LISTEN     
 tcp        0      0 127.0.0.1:6379          0.0.0.0:*               LISTEN     
 tcp6       0      0 :::22                    :::*                    LISTEN     
 tcp6       0      0 :::80                    :::*                    LISTEN"""
-        
-        elif command_lower.startswith("curl") or command_lower.startswith("wget"):
-            return """Connected to example.com (93.184.216.34:80)
+
+HTTP_OUTPUT = """Connected to example.com (93.184.216.34:80)
 HTTP/1.1 200 OK
 Date: Mon, 15 Jan 2024 10:30:45 GMT
 Server: nginx/1.18.0
@@ -204,87 +89,356 @@ Content-Type: text/html; charset=UTF-8
 <head><title>Welcome to Example Server</title></head>
 <body><h1>Server is running</h1></body>
 </html>"""
-        
-        elif command_lower.startswith("python"):
-            return "Python 3.8.10 (default, Jun 22 2022, 20:18:18)\n[GCC 9.4.0] on linux"
-        
-        elif command_lower.startswith("date"):
-            return f"Mon Jan 15 {datetime.now().strftime('%H:%M:%S')} UTC 2024"
-        
-        elif command_lower.startswith("uptime"):
-            return f" 10:30:45 up 23 days, 8:45, 1 user, load average: 0.08, 0.03, 0.00"
-        
-        elif command_lower.startswith("free"):
-            return """              total        used        free      shared  buff/cache   available
+
+PYTHON_OUTPUT = "Python 3.8.10 (default, Jun 22 2022, 20:18:18)\n[GCC 9.4.0] on linux"
+
+FREE_OUTPUT = """              total        used        free      shared  buff/cache   available
 Mem:        8053068     2048560     1234567       245678     4770941     3456789
 Swap:       2097148           0     2097148"""
-        
-        elif command_lower.startswith("df"):
-            return """Filesystem     Size  Used Avail Use% Mounted on
+
+DF_OUTPUT = """Filesystem     Size  Used Avail Use% Mounted on
 /dev/sda1       20G  8.5G   11G  45% /
 /dev/sda2        8G  2.1G  5.9G  27% /var
 tmpfs          3.9G     0  3.9G   0% /dev/shm"""
-        
-        elif command_lower.startswith("history"):
-            return """   1  ls -la
+
+HISTORY_OUTPUT = """   1  ls -la
    2  whoami  
    3  pwd
    4  date
    5  uptime
    6  ps aux"""
-        
-        elif command_lower.startswith("env"):
-            return """PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin
+
+ENV_OUTPUT = """PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin
 TERM=xterm-256color
 SHELL=/bin/bash
 HOME=/root
 USER=root
 PWD=/root"""
+
+# Indicators appended to responses for high- and medium-threat commands
+SUSPICIOUS_INDICATORS = (
+    b"\nWarning: Suspicious activity detected",
+    b"\nSystem integrity check initiated...",
+    b"\nAccess denied to secure component",
+    b"\n[ALERT] Security module activated",
+    b"\nMonitoring command execution..."
+)
+
+WARNING_INDICATORS = (
+    b"\nNote: Command logged for security audit",
+    b"\nWarning: Unusual command pattern detected",
+    b"\nSystem monitoring active"
+)
+
+# Responses for commands matched exactly
+EXACT_RESPONSES = {
+    "pwd": "/root",
+    "whoami": "root",
+    "id": "uid=0(root) gid=0(root) groups=0(root)",
+}
+
+# Responses keyed by the command's first token
+STATIC_RESPONSES = {
+    "uname": "Linux server 5.4.0-94-generic #106-Ubuntu SMP Thu Jan 6 23:58:14 UTC 2022 x86_64 x86_64 x86_64 GNU/Linux",
+    "netstat": NETSTAT_OUTPUT,
+    "curl": HTTP_OUTPUT,
+    "wget": HTTP_OUTPUT,
+    "python": PYTHON_OUTPUT,
+    "python3": PYTHON_OUTPUT,
+    "uptime": " 10:30:45 up 23 days, 8:45, 1 user, load average: 0.08, 0.03, 0.00",
+    "free": FREE_OUTPUT,
+    "df": DF_OUTPUT,
+    "history": HISTORY_OUTPUT,
+    "env": ENV_OUTPUT,
+    "mkdir": "mkdir: cannot create directory 'test': File exists",
+    "rm": "rm: cannot remove '/root/test': No such file or directory",
+    "su": "Authenticate as super user:",
+    "sudo": "Authenticate as super user:",
+}
+
+# Shell prompt sent after every response
+PROMPT = "\n[root@server ~]# "
+PROMPT_BYTES = PROMPT.encode()
+
+# Canned responses encoded once with the prompt baked in
+RESPONSE_PAYLOADS = {
+    response: (response + PROMPT).encode()
+    for response in (LS_OUTPUT, LS_LONG_OUTPUT, PS_AUX_OUTPUT, PASSWD_OUTPUT,
+                     *EXACT_RESPONSES.values(), *STATIC_RESPONSES.values())
+}
+
+class ConnectionHandler:
+    """Handles connection processing and response generation"""
+    
+    def __init__(self):
+        self.sessions_log = "/app/data/sessions.jsonl"
+        self.commands_log = "/app/data/commands.jsonl"
+        self.tsv_log = "/app/data/commands.tsv"
+        self._appends_since_trim = {}
+        self._log_queue = BatchQueue(
+            self._write_log_batch,
+            maxsize=LOG_QUEUE_SIZE,
+            batch_size=LOG_BATCH_SIZE,
+            flush_interval=LOG_FLUSH_INTERVAL,
+            drop_oldest=True,
+            name="Log queue",
+            idle_interval=LOG_FSYNC_INTERVAL,
+            on_idle=self._sync_idle_logs
+        )
+        self._log_fds = {}
+        self._last_fsync = 0.0
+        self._unsynced_logs = set()
+        self._responses = {
+            **STATIC_RESPONSES,
+            "ls": self._respond_ls,
+            "ps": self._respond_ps,
+            "cat": self._respond_cat,
+            "date": self._respond_date,
+            "echo": self._respond_echo,
+            "touch": self._respond_touch,
+        }
+        self._ensure_log_files()
+
+    def _ensure_log_files(self):
+        """Ensure log files exist"""
+        os.makedirs(os.path.dirname(self.sessions_log), exist_ok=True)
         
-        elif command_lower.startswith("echo"):
-            # Echo back the message
-            echo_msg = command[4:].strip()
-            return f'"{echo_msg}"'
+        # Initialize files if they don't exist
+        for log_file in [self.sessions_log, self.commands_log]:
+            if not os.path.exists(log_file):
+                open(log_file, 'a').close()
+
+        # Initialize CSV/TSV if needed
+        if not os.path.exists(self.tsv_log):
+            with open(self.tsv_log, 'w') as f:
+                f.write("timestamp\tip\tcommand\tthreat_level\tanomaly_score\n")
+
+    async def log_command(self, command: str, ip: str, analysis: Dict[str, Any]):
+        """Queue command with analysis results for the background log writer"""
+        try:
+            now = datetime.now()
+            timestamp = now.isoformat()
+            session_id = f"{ip}_{int(now.timestamp())}"
+            threat_level = analysis.get("threat_level", "UNKNOWN")
+            anomaly_score = analysis.get("anomaly_score", 0.0)
+            
+            # Create session entry
+            session_entry = {
+                "session_id": session_id,
+                "timestamp": timestamp,
+                "ip": ip,
+                "command": command,
+                "analysis": analysis,
+                "threat_level": threat_level,
+                "anomaly_score": anomaly_score
+            }
+            
+            # One record carries the JSON log lines and the TSV line for analysis
+            self._log_queue.put((
+                (self.sessions_log, self._format_json_line(session_entry)),
+                (self.commands_log, self._format_json_line({
+                    "timestamp": timestamp,
+                    "ip": ip,
+                    "command": command,
+                    "threat_level": threat_level,
+                    "anomaly_score": anomaly_score
+                })),
+                (self.tsv_log, self._format_tsv_line(timestamp, ip, command, threat_level, anomaly_score))
+            ))
+            
+            logger.debug("Logged command: %s from %s (Threat: %s)", command, ip, analysis.get('threat_level'))
+            
+        except Exception as e:
+            logger.error(f"Error logging command: {e}")
+
+    async def _write_log_batch(self, batch: List[tuple]):
+        """Write a batch of queued log records off the event loop"""
+        await asyncio.to_thread(self._write_batch, batch)
+
+    async def _sync_idle_logs(self):
+        """fsync writes left unsynced when the queue went idle"""
+        await asyncio.to_thread(self._sync_logs)
+
+    def _sync_logs(self):
+        """fsync every log file written since the last sync"""
+        self._last_fsync = time.monotonic()
+        for file_path in list(self._unsynced_logs):
+            self._unsynced_logs.discard(file_path)
+            fd = self._log_fds.get(file_path)
+            if fd is None:
+                continue
+            try:
+                os.fsync(fd)
+            except Exception as e:
+                logger.error(f"Error syncing {file_path}: {e}")
+
+    async def flush_logs(self):
+        """Wait until every queued log record has been written"""
+        await self._log_queue.join()
+
+    async def close(self, timeout: float = 5.0):
+        """Write queued log records (waiting up to timeout seconds), then close the log files"""
+        await self._log_queue.close(timeout)
+        await asyncio.to_thread(self._close_log_fds)
+
+    def _close_log_fds(self):
+        """fsync and close every open log descriptor"""
+        self._sync_logs()
+        for file_path in list(self._log_fds):
+            try:
+                self._close_log_fd(file_path)
+            except Exception as e:
+                logger.error(f"Error closing {file_path}: {e}")
+
+    def _write_batch(self, batch: List[tuple]):
+        """Write a batch of records with one write per file"""
+        # fsync at most once per LOG_FSYNC_INTERVAL instead of on every batch
+        now = time.monotonic()
+        sync = now - self._last_fsync >= LOG_FSYNC_INTERVAL
+        if sync:
+            self._last_fsync = now
+        
+        lines_by_file = {}
+        for record in batch:
+            for file_path, line in record:
+                lines_by_file.setdefault(file_path, []).append(line)
+        
+        for file_path, lines in lines_by_file.items():
+            try:
+                fd = self._get_log_fd(file_path)
+                data = memoryview("".join(lines).encode())
+                while data:
+                    data = data[os.write(fd, data):]
+                if sync:
+                    os.fsync(fd)
+                    self._unsynced_logs.discard(file_path)
+                else:
+                    # Synced by a later batch or, if writes stop, when the queue goes idle
+                    self._unsynced_logs.add(file_path)
+            except Exception as e:
+                self._close_log_fd(file_path)
+                logger.error(f"Error appending to {file_path}: {e}")
+                continue
+            
+            # Trim JSONL logs to the last MAX_LOG_ENTRIES periodically rather than on every write
+            if file_path == self.tsv_log:
+                continue
+            appended = self._appends_since_trim.get(file_path, 0) + len(lines)
+            if appended >= TRIM_INTERVAL:
+                try:
+                    # The trimmed file replaces the old inode, so reopen on next write
+                    self._close_log_fd(file_path)
+                    self._trim_log(file_path)
+                except Exception as e:
+                    logger.error(f"Error trimming {file_path}: {e}")
+                appended = 0
+            self._appends_since_trim[file_path] = appended
+
+    def _get_log_fd(self, file_path: str) -> int:
+        """Return the long-lived O_APPEND descriptor for a log file"""
+        fd = self._log_fds.get(file_path)
+        if fd is None:
+            fd = self._log_fds[file_path] = os.open(file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return fd
+
+    def _close_log_fd(self, file_path: str):
+        """Close the descriptor for a log file if one is open"""
+        fd = self._log_fds.pop(file_path, None)
+        if fd is not None:
+            os.close(fd)
+
+    def _format_json_line(self, data: Dict[str, Any]) -> str:
+        """Serialize data as one JSONL line"""
+        return json.dumps(data, separators=(',', ':')) + "\n"
+
+    def _trim_log(self, file_path: str):
+        """Keep only the last MAX_LOG_ENTRIES lines to prevent file bloat"""
+        with open(file_path, 'r') as f:
+            lines = deque(f, maxlen=MAX_LOG_ENTRIES)
+        
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.writelines(lines)
+        os.replace(tmp_path, file_path)
+
+    def _format_tsv_line(self, timestamp: str, ip: str, command: str, threat_level: str, score: float) -> str:
+        """Format a TSV log line for easy parsing"""
+        # Escape tabs and line breaks in command in a single pass
+        safe_command = command.translate(TSV_ESCAPE)
+        return f"{timestamp}\t{ip}\t{safe_command}\t{threat_level}\t{score}\n"
+
+    async def generate_response(self, command: str, analysis: Dict[str, Any]) -> bytes:
+        """Generate realistic response based on command and threat level, ready to send"""
+        threat_level = analysis.get("threat_level", "LOW")
+        
+        # Get base response
+        response = self._get_command_response(command.strip())
         
-        elif command_lower.startswith("touch"):
-            filename = command[5:].strip()
-            return f"touch: creating file '{filename}': Permission denied"
+        # Add threat-based delays and additional output
+        if threat_level in HIGH_THREAT_LEVELS:
+            # Add suspicious behavior indicators
+            return b"".join((response.encode(), self._add_suspicious_output(command), PROMPT_BYTES))
+        elif threat_level == "MEDIUM":
+            return b"".join((response.encode(), self._add_warning_output(command), PROMPT_BYTES))
         
-        elif command_lower.startswith("mkdir"):
-            return "mkdir: cannot create directory 'test': File exists"
+        # Canned responses are pre-encoded with the prompt already appended
+        payload = RESPONSE_PAYLOADS.get(response)
+        if payload is None:
+            payload = (response + PROMPT).encode()
+        return payload
+
+    def _get_command_response(self, command: str) -> str:
+        """Get realistic response for command"""
+        command_lower = command.lower()
         
-        elif command_lower.startswith("rm"):
-            return "rm: cannot remove '/root/test': No such file or directory"
+        response = EXACT_RESPONSES.get(command_lower)
+        if response is not None:
+            return response
         
-        elif command_lower.startswith("su ") or command_lower.startswith("sudo"):
-            return "Authenticate as super user:"
+        # Dispatch on the first token: either a canned response or a small handler
+        parts = command_lower.split(None, 1)
+        handler = self._responses.get(parts[0]) if parts else None
+        if isinstance(handler, str):
+            return handler
+        if handler is not None:
+            response = handler(command, command_lower)
+            if response is not None:
+                return response
         
-        else:
-            # Generic response for unknown commands
-            return f"-bash: {command.split()[0]}: command not found"
+        # Generic response for unknown commands
+        return f"-bash: {command.split()[0] if parts else command}: command not found"
+
+    def _respond_ls(self, command: str, command_lower: str) -> str:
+        if "-la" in command_lower or "-a" in command_lower:
+            return LS_LONG_OUTPUT
+        return LS_OUTPUT
+
+    def _respond_ps(self, command: str, command_lower: str) -> Optional[str]:
+        if command_lower.startswith("ps aux"):
+            return PS_AUX_OUTPUT
+        return None
+
+    def _respond_cat(self, command: str, command_lower: str) -> Optional[str]:
+        if command_lower.startswith("cat /etc/passwd"):
+            return PASSWD_OUTPUT
+        return None
 
-    def _add_suspicious_output(self, command: str) -> str:
+    def _respond_date(self, command: str, command_lower: str) -> str:
+        return f"Mon Jan 15 {datetime.now().strftime('%H:%M:%S')} UTC 2024"
+
+    def _respond_echo(self, command: str, command_lower: str) -> str:
+        # Echo back the message
+        echo_msg = command[4:].strip()
+        return f'"{echo_msg}"'
+
+    def _respond_touch(self, command: str, command_lower: str) -> str:
+        filename = command[5:].strip()
+        return f"touch: creating file '{filename}': Permission denied"
+
+    def _add_suspicious_output(self, command: str) -> bytes:
         """Add suspicious indicators for high-threat commands"""
-        indicators = [
-            "\nWarning: Suspicious activity detected",
-            "\nSystem integrity check initiated...",
-            "\nAccess denied to secure component",
-            "\n[ALERT] Security module activated",
-            "\nMonitoring command execution..."
-        ]
-        
-        # Add random indicator
-        import random
-        return random.choice(indicators)
+        return random.choice(SUSPICIOUS_INDICATORS)
 
-    def _add_warning_output(self, command: str) -> str:
+    def _add_warning_output(self, command: str) -> bytes:
         """Add warning indicators for medium-threat commands"""
-        warnings = [
-            "\nNote: Command logged for security audit",
-            "\nWarning: Unusual command pattern detected",
-            "\nSystem monitoring active"
-        ]
-        
-        # Add random warning
-        import random
-        return random.choice(warnings)
+        return random.choice(WARNING_INDICATORS)
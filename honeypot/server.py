@@ -8,43 +8,176 @@ import asyncio
 import os
 import json
 import logging
+from collections import OrderedDict, deque
+from dotenv import load_dotenv
 from datetime import datetime
-import threading
-import time
+
+from async_utils import ensure_http_session
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Prefer uvloop's libuv event loop when it is available
+if uvloop is not None:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+HIGH_THREAT_LEVELS = frozenset({"HIGH", "CRITICAL"})
+
+# Keywords scored by analyze_threat_level
+SUSPICIOUS_KEYWORDS = (
+    "rm -rf", "cat /etc/passwd", "cat /etc/shadow", "wget", 
+    "curl", "nc ", "systemctl", "su -", "sudo", "chmod +x", 
+    "python -c", "bash -c", "sh -c", "/bin/bash", "find /",
+    "kill -9", "iptables", "passwd", "id", "uname -a"
+)
+
+# Sessions kept in the JSONL log; trimmed every MAX_SESSIONS appends
+MAX_SESSIONS = 1000
+
+# Shell prompt sent after every response, and the banner sent on connect
+PROMPT = b"\r\n[user@server ~]# "
+WELCOME = b"Welcome to Industrial SSH Server v2.4.7\r\nLast login: Mon Jan 15 10:30:45 2024\r\n[user@server ~]# "
+
+# Pre-encoded responses for exact commands, then for command prefixes
+STATIC_RESPONSES = {
+    "ls": b"file1.txt  file2.txt  folder1/",
+    "ls -la": b"""total 8
+drwxr-xr-x 3 user user 4096 Jan 15 10:30 .
+drwxr-xr-x 2 user user 4096 Jan 15 10:30 ..
+-rw-r--r-- 1 user user  123 Jan 15 10:29 file1.txt
+-rw-r--r-- 1 user user  456 Jan 15 10:30 file2.txt
+drwxr-xr-x 2 user user 4096 Jan 15 10:30 folder1""",
+    "pwd": b"/home/user",
+    "whoami": b"user",
+    "uname -a": b"Linux demo-server 5.4.0-generic #106-Ubuntu SMP Thu Jan 6 23:58:14 UTC 2022 x86_64 x86_64 x86_64 GNU/Linux",
+    "ps aux": b"""USER       PID %CPU %MEM    VSZ   RSS TSTAT START   TIME COMMAND
+user         1  0.0  0.1 225836  9216 ?        Ss   Jan15   0:02 /sbin/init
+user        87 0.0 0.3 201532 24784 ?        Ss   Jan15   0:00 sshd: [listener]""",
+}
+
+PREFIX_RESPONSES = (
+    ("cat /etc/passwd", b"""root:x:0:0:root:/root:/bin/bash
+daemon:x:1:1:daemon:/usr/sbin:/usr/sbin/nologin
+bin:x:2:2:bin:/bin:/usr/sbin/nologin
+sys:x:3:3:sys:/dev:/usr/sbin/nologin"""),
+    ("rm -rf", b"""rm: cannot remove '/': Permission denied
+rm: cannot remove '/*': Permission denied"""),
+)
+
+# Per-connection line length cap, global and per-IP concurrent connection caps
+MAX_LINE_LENGTH = 8192
+MAX_CONNECTIONS = 1024
+MAX_CONNECTIONS_PER_IP = 16
+REFUSED_LOG_INTERVAL = 100
+
+ALERT_TEMPLATE = """%(emoji)s AIML Honeypot Alert!
+
+🌍 Source IP: %(ip)s
+🔍 Threat Level: %(threat_level)s
+💻 Command: %(command)s
+📊 Score: %(score).3f
+⏰ Time: %(time)s
+
+🤖 Detected by AIML Honeypot"""
+
+# Bytes stripped from each line; a line with nothing left is counted as a scan probe
+PROBE_BYTES = b" \t\r\n\x00"
+PROBE_LOG_INTERVAL = 100
+
+# Probe counts are kept across connections for the most recent MAX_SCAN_IPS sources
+# and written to scan_counts_file every PROBE_FLUSH_INTERVAL probes
+MAX_SCAN_IPS = 10000
+PROBE_FLUSH_INTERVAL = 100
+
 class SimpleHoneypot:
     def __init__(self, host="0.0.0.0", port=2222):
         self.host = host
         self.port = port
-        self.sessions_file = "data/sessions.json"
+        self.sessions_file = "data/sessions.jsonl"
         self.commands_file = "data/commands.log"
+        self.scan_counts_file = "data/scan_counts.json"
+        self._conn_sem = asyncio.Semaphore(MAX_CONNECTIONS)
+        self._ip_connections = {}
+        self._refused_connections = {}
+        self._scan_counts = self._load_scan_counts()
+        self._probes_since_flush = 0
+        self._scan_flush_task = None
+        self._keyword_automaton = self._build_keyword_automaton()
+        self._http = None
+        self._alert_tasks = set()
+        
+        # Load Telegram credentials once rather than on every alert
+        load_dotenv()
+        self._bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
+        self._chat_id = os.getenv("TELEGRAM_CHAT_ID")
+        if not self._bot_token or not self._chat_id:
+            logger.warning("Telegram credentials not configured. Please set TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID environment variables.")
+        self.active_connections = set()
         self._ensure_directories()
 
     def _ensure_directories(self):
         os.makedirs("data", exist_ok=True)
-        if not os.path.exists(self.sessions_file):
-            with open(self.sessions_file, 'w') as f:
-                json.dump([], f)
+        # Sessions are appended one JSON object per line
+        self._sessions_fp = open(self.sessions_file, 'a', buffering=1)
+        self._sessions_since_rotate = 0
+        self._commands_fp = open(self.commands_file, 'a', buffering=1)
+
+    def _rotate_sessions(self):
+        """Trim the sessions log to the last MAX_SESSIONS lines"""
+        try:
+            # The handle is line-buffered, so every logged session is already in the file;
+            # trim into a temp file and only swap handles once the replace has succeeded
+            with open(self.sessions_file, 'r') as f:
+                lines = deque(f, maxlen=MAX_SESSIONS)
+            
+            tmp_path = self.sessions_file + ".tmp"
+            with open(tmp_path, 'w') as f:
+                f.writelines(lines)
+            os.replace(tmp_path, self.sessions_file)
+            
+            old_fp, self._sessions_fp = self._sessions_fp, open(self.sessions_file, 'a', buffering=1)
+            old_fp.close()
+        except Exception as e:
+            logger.error(f"Error rotating sessions log: {e}")
+        finally:
+            self._sessions_since_rotate = 0
 
-    def analyze_threat_level(self, command):
+    def _build_keyword_automaton(self):
+        """Compile the suspicious keywords into an Aho-Corasick automaton"""
+        if ahocorasick is None:
+            return None
+        automaton = ahocorasick.Automaton()
+        for keyword in SUSPICIOUS_KEYWORDS:
+            automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+        return automaton
+
+    def analyze_threat_level(self, command, command_lower=None):
         """Simple threat analysis"""
-        suspicious_keywords = [
-            "rm -rf", "cat /etc/passwd", "cat /etc/shadow", "wget", 
-            "curl", "nc ", "systemctl", "su -", "sudo", "chmod +x", 
-            "python -c", "bash -c", "sh -c", "/bin/bash", "find /",
-            "kill -9", "iptables", "passwd", "id", "uname -a"
-        ]
-        
-        command_lower = command.lower()
-        threat_score = 0
+        if command_lower is None:
+            command_lower = command.lower()
         
-        for keyword in suspicious_keywords:
-            if keyword in command_lower:
-                threat_score += 1
+        if self._keyword_automaton is not None:
+            # Single pass over the command; each keyword counts once however often it matches
+            threat_score = len({keyword for _, keyword in self._keyword_automaton.iter(command_lower)})
+        else:
+            threat_score = sum(1 for keyword in SUSPICIOUS_KEYWORDS if keyword in command_lower)
         
         # Calculate threat level
         if threat_score >= 3:
@@ -56,11 +189,12 @@ class SimpleHoneypot:
         else:
             return "LOW", min(0.2, len(command) * 0.01)
 
-    def log_session(self, ip, command, threat_level, score):
+    def log_session(self, ip, command, threat_level, score, now=None):
         """Log session to file"""
+        now = now or datetime.now()
         session = {
-            "session_id": f"{ip}_{int(datetime.now().timestamp())}",
-            "timestamp": datetime.now().isoformat(),
+            "session_id": f"{ip}_{int(now.timestamp())}",
+            "timestamp": now.isoformat(),
             "ip": ip,
             "command": command,
             "threat_level": threat_level,
@@ -68,174 +202,253 @@ class SimpleHoneypot:
         }
         
         try:
-            # Load existing sessions
-            with open(self.sessions_file, 'r') as f:
-                sessions = json.load(f)
-            
-            sessions.append(session)
-            
-            # Save back (keep last 1000)
-            if len(sessions) > 1000:
-                sessions = sessions[-1000:]
+            # Append one line instead of rewriting every stored session
+            if orjson is not None:
+                line = orjson.dumps(session).decode()
+            else:
+                line = json.dumps(session, separators=(',', ':'))
+            self._sessions_fp.write(line + "\n")
             
-            with open(self.sessions_file, 'w') as f:
-                json.dump(sessions, f, indent=2)
+            # Periodically trim (keep last 1000)
+            self._sessions_since_rotate += 1
+            if self._sessions_since_rotate >= MAX_SESSIONS:
+                self._rotate_sessions()
             
             # Also append to commands.log
-            with open(self.commands_file, 'a') as f:
-                f.write(f"{ip}:{command}\n")
+            self._commands_fp.write(f"{ip}:{command}\n")
                 
-            logger.info(f"Session logged: {ip} -> {command} ({threat_level})")
+            logger.debug("Session logged: %s -> %s (%s)", ip, command, threat_level)
             return session
             
         except Exception as e:
             logger.error(f"Error logging session: {e}")
 
-    def generate_response(self, command):
+    def _load_scan_counts(self):
+        """Load probe counts saved by a previous run"""
+        try:
+            with open(self.scan_counts_file, 'r') as f:
+                return OrderedDict(json.load(f))
+        except FileNotFoundError:
+            return OrderedDict()
+        except Exception as e:
+            logger.error(f"Error loading scan counts: {e}")
+            return OrderedDict()
+
+    def _record_probe(self, ip):
+        """Count an empty probe from ip, keeping the most recently active sources"""
+        count = self._scan_counts.pop(ip, 0) + 1
+        self._scan_counts[ip] = count
+        if len(self._scan_counts) > MAX_SCAN_IPS:
+            self._scan_counts.popitem(last=False)
+        
+        if count % PROBE_LOG_INTERVAL == 0:
+            logger.info(f"{count} empty probes from {ip}")
+        
+        self._probes_since_flush += 1
+        if self._probes_since_flush >= PROBE_FLUSH_INTERVAL:
+            # Write a snapshot off the event loop; if a write is still running, retry on the next probe
+            if self._scan_flush_task is None or self._scan_flush_task.done():
+                self._probes_since_flush = 0
+                self._scan_flush_task = asyncio.create_task(
+                    asyncio.to_thread(self._write_scan_counts, dict(self._scan_counts))
+                )
+
+    def _write_scan_counts(self, counts):
+        """Write the per-IP probe counts to disk"""
+        try:
+            tmp_path = self.scan_counts_file + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(counts, f, separators=(',', ':'))
+            os.replace(tmp_path, self.scan_counts_file)
+        except Exception as e:
+            logger.error(f"Error saving scan counts: {e}")
+
+    def generate_response(self, command, command_lower=None):
         """Generate realistic command response"""
-        command_lower = command.lower().strip()
+        if command_lower is None:
+            command_lower = command.lower().strip()
         
-        if command_lower == "ls":
-            return "file1.txt  file2.txt  folder1/"
-        elif command_lower == "ls -la":
-            return """total 8
-drwxr-xr-x 3 user user 4096 Jan 15 10:30 .
-drwxr-xr-x 2 user user 4096 Jan 15 10:30 ..
--rw-r--r-- 1 user user  123 Jan 15 10:29 file1.txt
--rw-r--r-- 1 user user  456 Jan 15 10:30 file2.txt
-drwxr-xr-x 2 user user 4096 Jan 15 10:30 folder1"""
-        elif command_lower == "pwd":
-            return "/home/user"
-        elif command_lower == "whoami":
-            return "user"
-        elif command_lower == "uname -a":
-            return "Linux demo-server 5.4.0-generic #106-Ubuntu SMP Thu Jan 6 23:58:14 UTC 2022 x86_64 x86_64 x86_64 GNU/Linux"
-        elif command_lower == "ps aux":
-            return """USER       PID %CPU %MEM    VSZ   RSS TSTAT START   TIME COMMAND
-user         1  0.0  0.1 225836  9216 ?        Ss   Jan15   0:02 /sbin/init
-user        87 0.0 0.3 201532 24784 ?        Ss   Jan15   0:00 sshd: [listener]"""
-        elif command_lower.startswith("cat /etc/passwd"):
-            return """root:x:0:0:root:/root:/bin/bash
-daemon:x:1:1:daemon:/usr/sbin:/usr/sbin/nologin
-bin:x:2:2:bin:/bin:/usr/sbin/nologin
-sys:x:3:3:sys:/dev:/usr/sbin/nologin"""
-        elif command_lower.startswith("rm -rf") or command_lower.startswith("rm -rf /"):
-            return """rm: cannot remove '/': Permission denied
-rm: cannot remove '/*': Permission denied"""
-        else:
-            return f"-bash: {command.split()[0] if command.split() else command}: command not found"
+        response = STATIC_RESPONSES.get(command_lower)
+        if response is not None:
+            return response
+        
+        for prefix, response in PREFIX_RESPONSES:
+            if command_lower.startswith(prefix):
+                return response
+        
+        parts = command.split()
+        return f"-bash: {parts[0] if parts else command}: command not found".encode()
 
-    async def handle_client(self, client_socket, addr):
+    async def handle_client(self, reader, writer):
         """Handle client connection"""
-        ip = addr[0]
-        logger.info(f"New connection from {ip}")
+        peer = writer.get_extra_info('peername')
+        ip = peer[0] if peer else "unknown"
         
+        # Refuse a single source that tries to hold too many of the global slots
+        if self._ip_connections.get(ip, 0) >= MAX_CONNECTIONS_PER_IP:
+            # Log the first refusal and then every REFUSED_LOG_INTERVAL, not every one
+            refused = self._refused_connections.get(ip, 0) + 1
+            self._refused_connections[ip] = refused
+            if refused == 1 or refused % REFUSED_LOG_INTERVAL == 0:
+                logger.warning(f"Connection limit reached for {ip}, refused {refused} connections")
+            writer.close()
+            return
+        self._ip_connections[ip] = self._ip_connections.get(ip, 0) + 1
         try:
-            # Send welcome
-            welcome_msg = b"Welcome to Industrial SSH Server v2.4.7\r\nLast login: Mon Jan 15 10:30:45 2024\r\n[user@server ~]# "
-            client_socket.send(welcome_msg)
+            await self._serve_client(reader, writer, ip)
+        finally:
+            remaining = self._ip_connections[ip] - 1
+            if remaining:
+                self._ip_connections[ip] = remaining
+            else:
+                del self._ip_connections[ip]
+                refused = self._refused_connections.pop(ip, 0)
+                if refused:
+                    logger.info(f"Connection limit cleared for {ip} after {refused} refused connections")
+
+    async def _serve_client(self, reader, writer, ip):
+        """Run the shell session for an accepted connection"""
+        async with self._conn_sem:
+            logger.info(f"New connection from {ip}")
+            self.active_connections.add(writer)
             
-            while True:
-                # Receive command
-                data = client_socket.recv(1024)
-                if not data:
-                    break
-                
-                command = data.decode('utf-8', errors='ignore').strip()
-                if not command:
-                    continue
-                
-                logger.info(f"Command from {ip}: {command}")
-                
-                # Analyze threat
-                threat_level, score = self.analyze_threat_level(command)
-                
-                # Log session
-                session = self.log_session(ip, command, threat_level, score)
-                
-                # Generate response
-                response = self.generate_response(command)
-                
-                # Send response
-                client_socket.send(f"{response}\r\n[user@server ~]# ".encode())
+            # Disable Nagle so each short response goes out immediately,
+            # and let keepalive probes reap clients that vanished silently
+            sock = writer.get_extra_info('socket')
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            
+            try:
+                # Send welcome
+                writer.write(WELCOME)
+                await writer.drain()
                 
-                # Send Telegram alert for high threats
-                if threat_level in ["HIGH", "CRITICAL"]:
-                    self.send_telegram_alert(command, ip, threat_level, score)
+                while True:
+                    # Receive command, bounded by the stream's line limit
+                    try:
+                        data = await reader.readline()
+                    except (asyncio.LimitOverrunError, ValueError):
+                        logger.warning(f"Client {ip} exceeded {MAX_LINE_LENGTH} byte line limit")
+                        break
+                    if not data:
+                        break
                     
-        except Exception as e:
-            logger.error(f"Client {ip} error: {e}")
-        finally:
-            client_socket.close()
-            logger.info(f"Connection {ip} closed")
+                    # Scanner fast path: count empty/NUL probes without analysis or logging
+                    data = data.strip(PROBE_BYTES)
+                    if not data:
+                        self._record_probe(ip)
+                        continue
+                    
+                    command = data.decode('utf-8', errors='ignore').strip()
+                    if not command:
+                        continue
+                    
+                    logger.debug("Command from %s: %s", ip, command)
+                    
+                    # Lowercase once for both threat analysis and response lookup
+                    command_lower = command.lower()
+                    
+                    # Analyze threat
+                    threat_level, score = self.analyze_threat_level(command, command_lower)
+                    
+                    # Log session, sharing one clock read with the alert
+                    now = datetime.now()
+                    session = self.log_session(ip, command, threat_level, score, now)
+                    
+                    # Generate response
+                    response = self.generate_response(command, command_lower)
+                    
+                    # Send response
+                    writer.writelines((response, PROMPT))
+                    await writer.drain()
+                    
+                    # Send Telegram alert for high threats
+                    if threat_level in HIGH_THREAT_LEVELS:
+                        task = asyncio.create_task(self.send_telegram_alert(command, ip, threat_level, score, now))
+                        self._alert_tasks.add(task)
+                        task.add_done_callback(self._alert_tasks.discard)
+                        
+            except Exception as e:
+                logger.error(f"Client {ip} error: {e}")
+            finally:
+                self.active_connections.discard(writer)
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except Exception:
+                    pass
+                logger.info(f"Connection {ip} closed")
 
-    def send_telegram_alert(self, command, ip, threat_level, score):
+    async def send_telegram_alert(self, command, ip, threat_level, score, now=None):
         """Send Telegram alert"""
+        if not self._bot_token or not self._chat_id:
+            return
+        
+        now = now or datetime.now()
         try:
-            import requests
-            
-            # Load Telegram credentials from environment variables
-            import os
-            from dotenv import load_dotenv
-            
-            load_dotenv()
-            bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
-            chat_id = os.getenv("TELEGRAM_CHAT_ID")
-            
-            # Check if Telegram credentials are configured
-            if not bot_token or not chat_id:
-                logger.warning("Telegram credentials not configured. Please set TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID environment variables.")
-                return
-            
-            emoji = "🚨" if threat_level == "CRITICAL" else "⚠️"
-            message = f"""{emoji} AIML Honeypot Alert!
-
-🌍 Source IP: {ip}
-🔍 Threat Level: {threat_level}
-💻 Command: {command}
-📊 Score: {score:.3f}
-⏰ Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-🤖 Detected by AIML Honeypot"""
+            message = ALERT_TEMPLATE % {
+                "emoji": "🚨" if threat_level == "CRITICAL" else "⚠️",
+                "ip": ip,
+                "threat_level": threat_level,
+                "command": command,
+                "score": score,
+                "time": now.strftime('%Y-%m-%d %H:%M:%S')
+            }
 
-            url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+            url = f"https://api.telegram.org/bot{self._bot_token}/sendMessage"
             payload = {
-                "chat_id": chat_id,
+                "chat_id": self._chat_id,
                 "text": message,
                 "parse_mode": "Markdown"
             }
             
-            response = requests.post(url, json=payload, timeout=5)
-            if response.json().get("ok"):
+            async with self._get_http().post(url, json=payload) as response:
+                result = await response.json(content_type=None)
+            if result.get("ok"):
                 logger.info(f"Telegram alert sent for {ip}")
             else:
-                logger.error(f"Telegram alert failed: {response.json()}")
+                logger.error(f"Telegram alert failed: {result}")
                 
         except Exception as e:
             logger.error(f"Telegram alert error: {e}")
 
+    def _get_http(self):
+        """Return the shared aiohttp session, creating it on first use"""
+        self._http = ensure_http_session(self._http, total_timeout=5, limit=32, keepalive_timeout=60)
+        return self._http
+
     async def run_server(self):
         """Start the honeypot server"""
-        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server.bind((self.host, self.port))
-        server.listen(5)
+        server = await asyncio.start_server(
+            self.handle_client, self.host, self.port,
+            limit=MAX_LINE_LENGTH, reuse_address=True
+        )
         
         logger.info(f"🚀 Simple AIML Honeypot listening on {self.host}:{self.port}")
         
         try:
-            while True:
-                client_socket, addr = server.accept()
-                asyncio.create_task(self.handle_client(client_socket, addr))
-        except KeyboardInterrupt:
-            logger.info("Shutting down honeypot...")
+            async with server:
+                await server.serve_forever()
         finally:
-            server.close()
+            for writer in list(self.active_connections):
+                writer.close()
+            self._sessions_fp.close()
+            self._commands_fp.close()
+            if self._scan_flush_task is not None:
+                await self._scan_flush_task
+            if self._probes_since_flush:
+                self._write_scan_counts(self._scan_counts)
+            if self._http is not None:
+                await self._http.close()
 
     def run(self):
         """Main run method"""
         logger.info("Starting Simple AIML Honeypot...")
-        asyncio.run(self.run_server())
+        try:
+            asyncio.run(self.run_server())
+        except KeyboardInterrupt:
+            logger.info("Shutting down honeypot...")
 
 if __name__ == "__main__":
     honeypot = SimpleHoneypot()
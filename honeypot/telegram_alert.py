@@ -5,14 +5,50 @@ Provides alert functionality specifically for honeypot operations
 """
 
 import os
-import requests
+import aiohttp
 import logging
 import asyncio
 from datetime import datetime
 from typing import Optional
 
+from async_utils import BatchQueue, ensure_http_session
+
 logger = logging.getLogger(__name__)
 
+ALERT_QUEUE_SIZE = 1024
+ALERT_BATCH_SIZE = 20
+ALERT_FLUSH_INTERVAL = 1.0
+
+# Single-pass escape for Telegram's HTML parse mode
+HTML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
+THREAT_EMOJIS = {
+    "LOW": "🟢",
+    "MEDIUM": "🟡",
+    "HIGH": "🟠",
+    "CRITICAL": "🚨"
+}
+
+ALERT_TEMPLATE = """%(emoji)s <b>AIML Honeypot Alert</b>
+🌍 <b>Source IP:</b> <code>%(ip)s</code>
+🔍 <b>Threat Level:</b> %(threat_level)s
+💻 <b>Attempted Command:</b>
+<pre>%(command)s</pre>
+📊 <b>Anomaly Score:</b> %(score).3f
+⏰ <b>Time:</b> %(time)s
+"""
+
+SUMMARY_TEMPLATE = """📊 <b>Honeypot Activity Summary</b>
+
+⏱️ <b>Period:</b> {time_period}
+🔌 <b>Total Sessions:</b> {session_count}
+⚠️ <b>Threats Detected:</b> {threat_count}
+📈 <b>Threat Rate:</b> {rate:.1f}%
+
+🕒 <b>Reported:</b> {reported:%Y-%m-%d %H:%M:%S UTC}
+
+🤖 <i>AIML Honeypot Monitoring</i>"""
+
 class TelegramManager:
     """Telegram alerting for honeypot threats"""
     
@@ -20,6 +56,14 @@ class TelegramManager:
         self.bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
         self.chat_id = os.getenv("TELEGRAM_CHAT_ID")
         self.max_message_length = 4096
+        self._http = None
+        self._alert_queue = BatchQueue(
+            self._send_alert_batch,
+            maxsize=ALERT_QUEUE_SIZE,
+            batch_size=ALERT_BATCH_SIZE,
+            flush_interval=ALERT_FLUSH_INTERVAL,
+            name="Alert queue"
+        )
         
         if not self.bot_token or not self.chat_id:
             logger.warning("Telegram credentials not configured - alerts disabled")
@@ -32,48 +76,62 @@ class TelegramManager:
 
     async def send_alert(self, command: str, ip: str, threat_level: str, 
                        anomaly_score: float = None, additional_info: dict = None):
-        """Send threat alert to Telegram"""
+        """Queue a threat alert for Telegram
+        
+        Returns True when the alert is queued, not when it is delivered (delivery
+        errors are only logged); False if Telegram is unconfigured or the queue is full.
+        """
         if not self.is_configured():
             logger.debug("Telegram not configured, skipping alert")
             return False
 
-        # Create threat-level specific formatting
-        threat_emojis = {
-            "LOW": "🟢",
-            "MEDIUM": "🟡",
-            "HIGH": "🟠", 
-            "CRITICAL": "🚨"
+        message = ALERT_TEMPLATE % {
+            "emoji": THREAT_EMOJIS.get(threat_level, "⚠️"),
+            "ip": ip,
+            "threat_level": threat_level,
+            "command": self._sanitize_command(command),
+            "score": anomaly_score or 0.0,
+            "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')
         }
-        
-        emoji = threat_emojis.get(threat_level, "⚠️")
-        
-        # Format command for safe display
-        safe_command = self._sanitize_command(command)
-        
-        message = f"""{emoji} <b>AIML Honeypot Alert</b>
-🌍 <b>Source IP:</b> <code>{ip}</code>
-🔍 <b>Threat Level:</b> {threat_level}
-💻 <b>Attempted Command:</b>
-<pre>{safe_command}</pre>
-📊 <b>Anomaly Score:</b> {anomaly_score:.3f}
-⏰ <b>Time:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}
-"""
 
         if additional_info:
             message += f"\n📍 <b>Additional Info:</b>\n"
             for key, value in additional_info.items():
                 message += f"• {key}: {value}\n"
 
-        # Add honeypot identifier
-        message += f"\n🤖 <b>Detected by AIML Honeypot</b>"
+        return self._alert_queue.put(message)
+
+    async def _send_alert_batch(self, alerts: list):
+        """Send a batch of queued alerts as few Telegram messages as possible"""
+        for message in self._pack_alerts(alerts):
+            await self._send_message(message)
+
+    def _pack_alerts(self, alerts: list) -> list:
+        """Join alerts into messages that fit within max_message_length"""
+        footer = "\n🤖 <b>Detected by AIML Honeypot</b>"
+        if self._alert_queue.dropped:
+            footer = f"\n⚠️ {self._alert_queue.dropped} alerts dropped under load" + footer
+            self._alert_queue.dropped = 0
         
-        return await self._send_message(message)
+        limit = self.max_message_length - len(footer)
+        messages = []
+        current = ""
+        for alert in alerts:
+            if current and len(current) + len(alert) + 1 > limit:
+                messages.append(current + footer)
+                current = ""
+            current = f"{current}\n{alert}" if current else alert
+        messages.append(current + footer)
+        return messages
+
+    async def flush_alerts(self):
+        """Wait until every queued alert has been sent"""
+        await self._alert_queue.join()
 
     def _sanitize_command(self, command: str) -> str:
         """Sanitize command for safe Telegram display"""
         # Replace potentially harmful characters
-        safe = command.replace('<', '&lt;').replace('>', '&gt;')
-        safe = safe.replace('&', '&amp;')
+        safe = command.translate(HTML_ESCAPE)
         
         # Limit length if needed
         if len(safe) > 500:
@@ -96,42 +154,53 @@ class TelegramManager:
                 "disable_web_page_preview": True
             }
 
-            response = requests.post(url, json=payload, timeout=10)
-            response.raise_for_status()
+            async with self._get_http().post(url, json=payload) as response:
+                response.raise_for_status()
+                result = await response.json(content_type=None)
 
-            if response.json().get("ok"):
+            if result.get("ok"):
                 logger.info("Telegram alert sent successfully")
                 return True
             else:
-                logger.error(f"Telegram API error: {response.json()}")
+                logger.error(f"Telegram API error: {result}")
                 return False
 
-        except requests.exceptions.Timeout:
+        except asyncio.TimeoutError:
             logger.error("Telegram API timeout")
             return False
-        except requests.exceptions.RequestException as e:
+        except aiohttp.ClientError as e:
             logger.error(f"Failed to send Telegram alert: {e}")
             return False
         except Exception as e:
             logger.error(f"Unexpected error sending Telegram alert: {e}")
             return False
 
+    def _get_http(self):
+        """Return the shared aiohttp session, creating it on first use"""
+        self._http = ensure_http_session(self._http, total_timeout=10)
+        return self._http
+
+    async def close(self, timeout: float = 5.0):
+        """Send queued alerts (waiting up to timeout seconds), then close the HTTP session"""
+        await self._alert_queue.close(timeout)
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        self._http = None
+
     async def send_summary_alert(self, session_count: int, threat_count: int, 
                                time_period: str = "last hour"):
         """Send summary alert"""
         if not self.is_configured():
             return False
 
-        message = f"""📊 <b>Honeypot Activity Summary</b>
-
-⏱️ <b>Period:</b> {time_period}
-🔌 <b>Total Sessions:</b> {session_count}
-⚠️ <b>Threats Detected:</b> {threat_count}
-📈 <b>Threat Rate:</b> {(threat_count/session_count*100):.1f if session_count > 0 else 0.0}%
-
-🕒 <b>Reported:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}
-
-🤖 <i>AIML Honeypot Monitoring</i>"""
+        rate = (threat_count / session_count * 100) if session_count else 0.0
+        message = SUMMARY_TEMPLATE.format(
+            time_period=time_period,
+            session_count=session_count,
+            threat_count=threat_count,
+            rate=rate,
+            reported=datetime.now()
+        )
 
         return await self._send_message(message)
 